@@ -1,13 +1,9 @@
 import enum
-from functools import singledispatch
 from typing import Union
 
-had_error = False
-had_runtime_error = False
-
 
 @enum.unique
-class TokenType(enum.Enum):
+class TokenType(enum.IntEnum):
     # Single character tokens.
     LEFT_PAREN = enum.auto()
     RIGHT_PAREN = enum.auto()
@@ -78,6 +74,7 @@ KEYWORDS = {k: getattr(TokenType, k.upper()) for k in (
 
 
 class Token:
+    __slots__ = ('token_type', 'lexeme', 'literal', 'line')
 
     def __init__(self, token_type: TokenType, lexeme: str,
                  literal: Union[None, str, float], line: int):
@@ -87,7 +84,18 @@ class Token:
         self.line = line
 
     def __str__(self) -> str:
-        return f'{self.token_type} {self.lexeme} {self.literal}'
+        return f'{self.token_type.name} {self.lexeme} {self.literal}'
+
+
+class ErrorState:
+    __slots__ = ('had_error', 'had_runtime_error')
+
+    def __init__(self):
+        self.had_error = False
+        self.had_runtime_error = False
+
+
+state = ErrorState()
 
 
 class LoxRuntimeError(RuntimeError):
@@ -98,31 +106,20 @@ class LoxRuntimeError(RuntimeError):
         super().__init__(msg)
 
 
-@singledispatch
-def error(arg, msg):
-    raise NotImplemented('invalid call to generic error fn')
-
-
-@error.register
-def _(line: int, msg: str) -> None:
-    report(line, '', msg)
-
-
-@error.register
-def _(token: Token, msg: str) -> None:
-    if token.token_type == TokenType.EOF:
-        report(token.line, ' at end', msg)
+def error(where: Union[int, Token], msg: str) -> None:
+    if not isinstance(where, Token):
+        report(where, '', msg)
+    elif where.token_type is TokenType.EOF:
+        report(where.line, ' at end', msg)
     else:
-        report(token.line, ' at "' + token.lexeme + '"', msg)
+        report(where.line, ' at "' + where.lexeme + '"', msg)
 
 
 def runtime_error(err: LoxRuntimeError) -> None:
     print(f'{str(err)}\n[line {err.token.line}]')
-    global had_runtime_error
-    had_runtime_error = True
+    state.had_runtime_error = True
 
 
 def report(line: int, where: str, msg: str) -> None:
     print(f'[line {line}] Error{where}: {msg}')
-    global had_error
-    had_error = True
+    state.had_error = True
@@ -1,124 +1,191 @@
 from __future__ import annotations
 
 import abc
-from dataclasses import dataclass
-from typing import Any, Generic, TypeVar
+import sys
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Generic, Optional, TypeVar
 
-from common import Token
+from common import Token, TokenType
 
 _T = TypeVar('_T')
 
+# dataclass() only accepts slots= from Python 3.10 on; older versions get
+# nodes with a per-instance __dict__.
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Node kinds, stored as the class-level OP of each concrete Expr so visitors
+# can dispatch with a single index instead of going through accept().
+OP_BINARY = 0
+OP_GROUPING = 1
+OP_LITERAL = 2
+OP_UNARY = 3
+OP_VARIABLE = 4
+OP_ASSIGN = 5
+OP_CALL = 6
+OP_LOGICAL = 7
+OP_GET = 8
+OP_SET = 9
+OP_THIS = 10
+OP_SUPER = 11
+
 
 class Expr(abc.ABC):
+    __slots__ = ()
+    OP: ClassVar[int]
 
     @abc.abstractmethod
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         pass
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    operator_type: TokenType = field(init=False)
+
+    OP = OP_BINARY
+
+    def __post_init__(self) -> None:
+        self.operator_type = self.operator.token_type
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_binary_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Grouping(Expr):
     expression: Expr
 
+    OP = OP_GROUPING
+
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_grouping_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Literal(Expr):
     value: Any
 
+    OP = OP_LITERAL
+
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_literal_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Unary(Expr):
     operator: Token
     right: Expr
+    operator_type: TokenType = field(init=False)
+
+    OP = OP_UNARY
+
+    def __post_init__(self) -> None:
+        self.operator_type = self.operator.token_type
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_unary_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Variable(Expr):
     name: Token
+    distance: Optional[int] = field(default=None, init=False)
+
+    OP = OP_VARIABLE
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_variable_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Assign(Expr):
     name: Token
     value: Expr
+    distance: Optional[int] = field(default=None, init=False)
+
+    OP = OP_ASSIGN
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_assign_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Call(Expr):
     callee: Expr
     paren: Token
     arguments: list[Expr]
 
+    OP = OP_CALL
+
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_call_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Logical(Expr):
     left: Expr
     operator: Token
     right: Expr
+    operator_type: TokenType = field(init=False)
+
+    OP = OP_LOGICAL
+
+    def __post_init__(self) -> None:
+        self.operator_type = self.operator.token_type
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_logical_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Get(Expr):
     obj: Expr
     name: Token
+    cached_class: Any = field(default=None, init=False)
+    cached_slot: int = field(default=0, init=False)
+    cached_method: Any = field(default=None, init=False)
+
+    OP = OP_GET
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_get_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Set(Expr):
     obj: Expr
     name: Token
     value: Expr
+    cached_class: Any = field(default=None, init=False)
+    cached_slot: int = field(default=0, init=False)
+
+    OP = OP_SET
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_set_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class This(Expr):
     keyword: Token
+    distance: Optional[int] = field(default=None, init=False)
+
+    OP = OP_THIS
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_this_expr(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Super(Expr):
     keyword: Token
     method: Token
+    distance: Optional[int] = field(default=None, init=False)
+
+    OP = OP_SUPER
 
     def accept(self, visitor: ExprVisitor[_T]) -> _T:
         return visitor.visit_super_expr(self)
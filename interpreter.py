@@ -1,33 +1,157 @@
 from __future__ import annotations
 
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Union
 
 from common import LoxRuntimeError, Token, TokenType, runtime_error
-from expr import (Assign, Binary, Call, Expr, ExprVisitor, Get, Grouping,
-                  Literal, Logical, Set, Super, This, Unary, Variable)
+from expr import (OP_ASSIGN, OP_BINARY, OP_CALL, OP_GET, OP_GROUPING,
+                  OP_LITERAL, OP_LOGICAL, OP_SET, OP_SUPER, OP_THIS, OP_UNARY,
+                  OP_VARIABLE, Assign, Binary, Call, Expr, ExprVisitor, Get,
+                  Grouping, Literal, Logical, Set, Super, This, Unary,
+                  Variable)
 from stmt import (Block, Class, Expression, Function, If, Print, Return, Stmt,
                   StmtVisitor, Var, While)
 
+# Operator token types, bound once so the hot paths compare plain ints.
+_BANG = TokenType.BANG
+_MINUS = TokenType.MINUS
+_OR = TokenType.OR
+
+_BinaryHandler = Callable[[Token, Any, Any], Any]
+
+# Lookup default that tells a missing name apart from a nil value.
+_MISSING = object()
+
+# Marks an instance field slot that the class shape knows but this instance
+# has not assigned.
+_UNSET = object()
+
+
+def _number_operands_error(operator: Token) -> LoxRuntimeError:
+    return LoxRuntimeError(operator, 'Operands must be numbers.')
+
+
+# Spelled out per operator so floats hit CPython's specialised opcodes.
+def _subtract(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left - right
+    raise _number_operands_error(operator)
+
+
+def _multiply(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left * right
+    raise _number_operands_error(operator)
+
+
+def _greater(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left > right
+    raise _number_operands_error(operator)
+
+
+def _greater_equal(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left >= right
+    raise _number_operands_error(operator)
+
+
+def _less(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left < right
+    raise _number_operands_error(operator)
+
+
+def _less_equal(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left <= right
+    raise _number_operands_error(operator)
+
+
+def _not_equal(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left != right
+    raise _number_operands_error(operator)
+
+
+def _equal(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left == right
+    raise _number_operands_error(operator)
+
+
+def _divide(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        if right == 0:
+            raise LoxRuntimeError(operator, 'Division by zero error.')
+        return left / right
+    raise _number_operands_error(operator)
+
+
+def _add(operator: Token, left: Any, right: Any) -> Any:
+    if type(left) is float and type(right) is float:
+        return left + right
+    if type(left) is str and type(right) is str:
+        return left + right
+    raise LoxRuntimeError(
+        operator, 'Operands must be two numbers or two strings.')
+
+
+_BINARY_OPERATORS: dict[TokenType, _BinaryHandler] = {
+    TokenType.MINUS: _subtract,
+    TokenType.STAR: _multiply,
+    TokenType.SLASH: _divide,
+    TokenType.PLUS: _add,
+    TokenType.GREATER: _greater,
+    TokenType.GREATER_EQUAL: _greater_equal,
+    TokenType.LESS: _less,
+    TokenType.LESS_EQUAL: _less_equal,
+    TokenType.BANG_EQUAL: _not_equal,
+    TokenType.EQUAL_EQUAL: _equal,
+}
+
+
+def _is_truthy(obj: Any) -> bool:
+    return obj is not None and obj is not False
+
+
+def _stringify(obj: Any) -> str:
+    if obj is None:
+        return 'nil'
+    if obj is True:
+        return 'true'
+    if obj is False:
+        return 'false'
+    if type(obj) is float:
+        text = str(obj)
+        if text.endswith('.0'):
+            text = text[0:len(text) - 2]
+        return text
+    return str(obj)
+
 
 class Environment:
+    __slots__ = ('enclosing', 'values', 'frames')
 
     def __init__(self, enclosing: Optional[Environment] = None):
         self.enclosing = enclosing
         self.values: dict[str, Any] = {}
+        # frames[d] is the values of the scope d hops out, so resolved
+        # lookups index straight into it instead of walking the chain.
+        self.frames: tuple[dict[str, Any], ...] = (self.values,)
+        if enclosing is not None:
+            self.frames += enclosing.frames
 
     def define(self, name: str, value: Any) -> None:
         self.values[name] = value
 
     def get(self, name: Token) -> Any:
-        try:
-            return self.values[name.lexeme]
-        except KeyError:
-            if self.enclosing is not None:
-                return self.enclosing.get(name)
-            else:
-                raise LoxRuntimeError(
-                    name, f'Undefined variable {name.lexeme}.')
+        value = self.values.get(name.lexeme, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.enclosing is not None:
+            return self.enclosing.get(name)
+        raise LoxRuntimeError(name, f'Undefined variable {name.lexeme}.')
 
     def assign(self, name: Token, value: Any) -> None:
         if name.lexeme in self.values:
@@ -39,20 +163,11 @@ class Environment:
         raise LoxRuntimeError(name, f'Undefined variable "{name.lexeme}".')
 
     def get_at(self, distance: int, name: str) -> Any:
-        return self._ancestor(distance).values.get(name)
-
-    def _ancestor(self, distance: int) -> Environment:
-        environment = self
-        for i in range(distance):
-            assert environment.enclosing is not None
-            environment = environment.enclosing
-        return environment
-
-    def assign_at(self, distance: int, name: Token, value: Any) -> None:
-        self._ancestor(distance).values[name.lexeme] = value
+        return self.frames[distance].get(name)
 
 
 class LoxCallable:
+    __slots__ = ()
 
     def call(self, interpreter: Interpreter, arguments: list[Any]) -> Any:
         pass
@@ -61,14 +176,13 @@ class LoxCallable:
         pass
 
 
-class LoxReturn(RuntimeError):
-
-    def __init__(self, value: Any):
-        self.value = value
-        super().__init__(None)
-
-
 class LoxFunction(LoxCallable):
+    __slots__ = (
+        'declaration',
+        'closure',
+        'is_initializer',
+        'shared_environment')
+
     def __init__(
             self,
             declaration: Function,
@@ -77,20 +191,28 @@ class LoxFunction(LoxCallable):
         self.declaration = declaration
         self.closure = closure
         self.is_initializer = is_initializer
+        # A scope nothing is ever defined in stays empty, so every call can
+        # share one instead of allocating its own.
+        self.shared_environment = None
+        if not declaration.needs_frame:
+            self.shared_environment = Environment(closure)
 
     def call(self, interpreter: Interpreter, arguments: list[Any]) -> Any:
-        environment = Environment(self.closure)
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
-        try:
-            interpreter._execute_block(self.declaration.body, environment)
-        except LoxReturn as r:
-            if self.is_initializer:
-                return self.closure.get_at(0, 'this')
-            return r.value
+        environment = self.shared_environment
+        if environment is None:
+            environment = Environment(self.closure)
+            values = environment.values
+            for i, name in enumerate(self.declaration.param_names):
+                values[name] = arguments[i]
+        interpreter._execute_block(self.declaration.body, environment)
+        value = None
+        if interpreter._returning:
+            interpreter._returning = False
+            value = interpreter._return_value
+            interpreter._return_value = None
         if self.is_initializer:
             return self.closure.get_at(0, 'this')
-        return None
+        return value
 
     def bind(self, instance: LoxInstance) -> LoxFunction:
         environment = Environment(self.closure)
@@ -105,6 +227,7 @@ class LoxFunction(LoxCallable):
 
 
 class ClockFunction(LoxCallable):
+    __slots__ = ()
 
     def arity(self) -> int:
         return 0
@@ -112,8 +235,12 @@ class ClockFunction(LoxCallable):
     def call(self, interpreter: Interpreter, arguments: list[Any]) -> Any:
         return time.time()
 
+    def __str__(self) -> str:
+        return '<native fn>'
+
 
 class LoxClass(LoxCallable):
+    __slots__ = ('name', 'superclass', 'methods', 'shape')
 
     def __init__(self,
                  name: str,
@@ -123,11 +250,18 @@ class LoxClass(LoxCallable):
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        # Property name -> slot index in LoxInstance.fields, shared by all
+        # instances of the class. Only ever grows.
+        self.shape: dict[str, int] = {}
+
+    def slot(self, name: str) -> int:
+        slot = self.shape.get(name)
+        if slot is None:
+            slot = self.shape[name] = len(self.shape)
+        return slot
 
     def find_method(self, name: str) -> Optional[LoxFunction]:
-        if name in self.methods:
-            return self.methods[name]
-        return None
+        return self.methods.get(name)
 
     def __str__(self) -> str:
         return self.name
@@ -147,25 +281,20 @@ class LoxClass(LoxCallable):
 
 
 class LoxInstance:
+    __slots__ = ('klass', 'fields')
 
     def __init__(self, klass: LoxClass):
         self.klass = klass
-        self.fields: dict[str, Any] = {}
+        self.fields: list[Any] = []
 
     def __str__(self) -> str:
         return f'{self.klass.name} instance'
 
-    def get(self, name: Token) -> Any:
-        if name.lexeme in self.fields:
-            return self.fields.get(name.lexeme)
-        method = self.klass.find_method(name.lexeme)
-        if method is not None:
-            return method.bind(self)
-
-        raise LoxRuntimeError(name, f'Undefined property "{name.lexeme}".')
-
-    def set(self, name: Token, value: Any) -> None:
-        self.fields[name.lexeme] = value
+    def set_slot(self, slot: int, value: Any) -> None:
+        fields = self.fields
+        if slot >= len(fields):
+            fields.extend([_UNSET] * (slot + 1 - len(fields)))
+        fields[slot] = value
 
 
 class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
@@ -173,8 +302,28 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
     def __init__(self):
         self.globals = Environment()
         self.environment = self.globals
-        self.globals.define('clock', ClockFunction)
-        self.locals: dict[Expr, int] = {}
+        self.globals.define('clock', ClockFunction())
+        # Set by a return statement; blocks and loops unwind until the
+        # enclosing LoxFunction.call picks up the value and clears it.
+        self._returning = False
+        self._return_value: Any = None
+        # Indexed by Expr.OP; replaces the accept() round trip on the hot
+        # path.
+        dispatch: dict[int, Callable[[Any], Any]] = {
+            OP_BINARY: self.visit_binary_expr,
+            OP_GROUPING: self.visit_grouping_expr,
+            OP_LITERAL: self.visit_literal_expr,
+            OP_UNARY: self.visit_unary_expr,
+            OP_VARIABLE: self.visit_variable_expr,
+            OP_ASSIGN: self.visit_assign_expr,
+            OP_CALL: self.visit_call_expr,
+            OP_LOGICAL: self.visit_logical_expr,
+            OP_GET: self.visit_get_expr,
+            OP_SET: self.visit_set_expr,
+            OP_THIS: self.visit_this_expr,
+            OP_SUPER: self.visit_super_expr,
+        }
+        self._dispatch = [dispatch[op] for op in range(len(dispatch))]
 
     def interpret(self, statements: list[Optional[Stmt]]) -> None:
         try:
@@ -187,27 +336,19 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
     def _execute(self, stmt: Stmt) -> None:
         stmt.accept(self)
 
-    def resolve(self, expr: Expr, depth: int) -> None:
-        self.locals[expr] = depth
-
-    def _stringify(self, obj: Any) -> str:
-        if obj is None:
-            return 'nil'
-        if isinstance(obj, bool):
-            return str(obj).lower()
-        if isinstance(obj, float):
-            text = str(obj)
-            if text.endswith('.0'):
-                text = text[0:len(text) - 2]
-            return text
-        return str(obj)
+    def resolve(
+            self,
+            expr: Union[Variable, Assign, This, Super],
+            depth: int) -> None:
+        # Stored on the node itself; None (the default) means global.
+        expr.distance = depth
 
     def visit_expression_stmt(self, stmt: Expression) -> None:
         self._evaluate(stmt.expression)
 
     def visit_print_stmt(self, stmt: Print) -> None:
         value = self._evaluate(stmt.expression)
-        print(self._stringify(value))
+        print(_stringify(value))
 
     def visit_var_stmt(self, stmt: Var) -> None:
         if stmt.initializer is not None:
@@ -235,20 +376,25 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
             function = LoxFunction(
                 method, self.environment, method.name.lexeme == 'init')
             methods[method.name.lexeme] = function
+        if superclass is not None:
+            # Flatten inherited methods in so lookups never walk the chain.
+            methods = {**superclass.methods, **methods}
         klass = LoxClass(stmt.name.lexeme, superclass, methods)
         if superclass is not None:
             self.environment = self.environment.enclosing
         self.environment.assign(stmt.name, klass)
 
     def visit_if_stmt(self, stmt: If) -> None:
-        if self._is_truthy(self._evaluate(stmt.condition)):
+        if _is_truthy(self._evaluate(stmt.condition)):
             self._execute(stmt.then_branch)
         elif stmt.else_branch is not None:
             self._execute(stmt.else_branch)
 
     def visit_while_stmt(self, stmt: While) -> None:
-        while self._is_truthy(self._evaluate(stmt.condition)):
+        while _is_truthy(self._evaluate(stmt.condition)):
             self._execute(stmt.body)
+            if self._returning:
+                return
 
     def visit_function_stmt(self, stmt: Function) -> None:
         function = LoxFunction(stmt, self.environment, False)
@@ -260,7 +406,8 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
             value = self._evaluate(stmt.value)
         else:
             value = None
-        raise LoxReturn(value)
+        self._return_value = value
+        self._returning = True
 
     def _execute_block(self,
                        statements: list[Optional[Stmt]],
@@ -271,25 +418,34 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
             for stmt in statements:
                 assert stmt is not None
                 self._execute(stmt)
+                if self._returning:
+                    break
         finally:
             self.environment = previous
 
     def visit_assign_expr(self, expr: Assign) -> Any:
         value = self._evaluate(expr.value)
-        distance = self.locals.get(expr)
+        distance = expr.distance
         if distance is not None:
-            self.environment.assign_at(distance, expr.name, value)
+            self.environment.frames[distance][expr.name.lexeme] = value
         else:
             self.globals.assign(expr.name, value)
         return value
 
     def visit_variable_expr(self, expr: Variable) -> Any:
-        return self._lookup_variable(expr.name, expr)
+        # Same as _lookup_variable, inlined for the most frequent node.
+        distance = expr.distance
+        if distance is not None:
+            return self.environment.frames[distance].get(expr.name.lexeme)
+        return self.globals.get(expr.name)
 
-    def _lookup_variable(self, name: Token, expr: Expr) -> Any:
-        distance = self.locals.get(expr)
+    def _lookup_variable(
+            self,
+            name: Token,
+            expr: Union[Variable, This]) -> Any:
+        distance = expr.distance
         if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
+            return self.environment.frames[distance].get(name.lexeme)
         else:
             return self.globals.get(name)
 
@@ -301,76 +457,59 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
 
     def visit_unary_expr(self, expr: Unary) -> Any:
         right = self._evaluate(expr.right)
-        if expr.operator.token_type == TokenType.MINUS:
-            self._check_number_operand(expr.operator, right)
-            return -right
-        if expr.operator.token_type == TokenType.BANG:
-            return not self._is_truthy(right)
+        tt = expr.operator_type
+        if tt == _MINUS:
+            if type(right) is float:
+                return -right
+            raise LoxRuntimeError(expr.operator, 'Operand must be a number.')
+        if tt == _BANG:
+            return not _is_truthy(right)
         # Unreachable
         return None
 
-    def _check_number_operand(self, operator: Token, operand: Any) -> None:
-        if isinstance(operand, float):
-            return
-        raise LoxRuntimeError(operator, 'Operand must be a number.')
-
     def visit_logical_expr(self, expr: Logical) -> Any:
-        left = self._evaluate(expr.left)
-        if expr.operator.token_type == TokenType.OR:
-            if self._is_truthy(left):
-                return left
-        else:
-            if not self._is_truthy(left):
-                return left
-        return self._evaluate(expr.right)
+        left = expr.left
+        if type(left) is not Logical or type(left.left) is not Logical:
+            value = self._evaluate(left)
+            if expr.operator_type == _OR:
+                if _is_truthy(value):
+                    return value
+            else:
+                if not _is_truthy(value):
+                    return value
+            return self._evaluate(expr.right)
+        # Same as visit_binary_expr: "a or b or ..." is a left-leaning
+        # spine. Each link only evaluates its right operand when the value
+        # so far does not short-circuit it.
+        spine = [expr]
+        while type(left) is Logical:
+            spine.append(left)
+            left = left.left
+        value = self._evaluate(left)
+        for node in reversed(spine):
+            if _is_truthy(value) is not (node.operator_type == _OR):
+                value = self._evaluate(node.right)
+        return value
 
     def visit_binary_expr(self, expr: Binary) -> Any:
-        left = self._evaluate(expr.left)
-        right = self._evaluate(expr.right)
-
-        def _is_tt(t: TokenType) -> bool:
-            return expr.operator.token_type == t
-
-        if _is_tt(TokenType.MINUS):
-            self._check_number_operands(expr.operator, left, right)
-            return left - right
-        if _is_tt(TokenType.STAR):
-            self._check_number_operands(expr.operator, left, right)
-            return left * right
-        if _is_tt(TokenType.SLASH):
-            self._check_number_operands(expr.operator, left, right)
-            if right == 0:
-                raise LoxRuntimeError(expr.operator, 'Division by zero error.')
-            return left / right
-        if _is_tt(TokenType.PLUS):
-            if isinstance(left, float) and isinstance(right, float):
-                return left + right
-            if isinstance(left, str) and isinstance(right, str):
-                return left + right
-            raise LoxRuntimeError(
-                expr.operator, 'Operands must be two numbers or two strings.')
-            return left + right
-        if _is_tt(TokenType.GREATER):
-            self._check_number_operands(expr.operator, left, right)
-            return left > right
-        if _is_tt(TokenType.GREATER_EQUAL):
-            self._check_number_operands(expr.operator, left, right)
-            return left >= right
-        if _is_tt(TokenType.LESS):
-            self._check_number_operands(expr.operator, left, right)
-            return left < right
-        if _is_tt(TokenType.LESS_EQUAL):
-            self._check_number_operands(expr.operator, left, right)
-            return left <= right
-        if _is_tt(TokenType.BANG_EQUAL):
-            self._check_number_operands(expr.operator, left, right)
-            return left != right
-        if _is_tt(TokenType.EQUAL_EQUAL):
-            self._check_number_operands(expr.operator, left, right)
-            return left == right
-
-        # Unreachable.
-        assert False
+        left = expr.left
+        if type(left) is not Binary or type(left.left) is not Binary:
+            handler = _BINARY_OPERATORS[expr.operator_type]
+            return handler(expr.operator, self._evaluate(left),
+                           self._evaluate(expr.right))
+        # The parser builds operator chains such as 1 + 2 + ... + n as a
+        # left-leaning spine. Past a couple of links, walk it with an
+        # explicit stack so long chains cost one Python frame rather than
+        # one per operator.
+        spine = [expr]
+        while type(left) is Binary:
+            spine.append(left)
+            left = left.left
+        value = self._evaluate(left)
+        for node in reversed(spine):
+            handler = _BINARY_OPERATORS[node.operator_type]
+            value = handler(node.operator, value, self._evaluate(node.right))
+        return value
 
     def visit_call_expr(self, expr: Call) -> Any:
         callee = self._evaluate(expr.callee)
@@ -380,31 +519,53 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(
                 expr.paren, 'Can only call functions and classes.')
-        if len(arguments) != callee.arity():
+        arity = callee.arity()
+        if len(arguments) != arity:
             raise LoxRuntimeError(
                 expr.paren,
-                f'Expected {callee.arity()} arguments but got {len(arguments)}.')
+                f'Expected {arity} arguments but got {len(arguments)}.')
         return callee.call(self, arguments)
 
     def visit_get_expr(self, expr: Get) -> Any:
         obj = self._evaluate(expr.obj)
-        if isinstance(obj, LoxInstance):
-            return obj.get(expr.name)
-        raise LoxRuntimeError(expr.name, 'Only instances have properties.')
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(
+                expr.name, 'Only instances have properties.')
+        klass = obj.klass
+        if klass is not expr.cached_class:
+            expr.cached_class = klass
+            expr.cached_slot = klass.slot(expr.name.lexeme)
+            expr.cached_method = klass.find_method(expr.name.lexeme)
+        slot = expr.cached_slot
+        fields = obj.fields
+        if slot < len(fields):
+            value = fields[slot]
+            if value is not _UNSET:
+                return value
+        method = expr.cached_method
+        if method is not None:
+            return method.bind(obj)
+        raise LoxRuntimeError(
+            expr.name, f'Undefined property "{expr.name.lexeme}".')
 
     def visit_set_expr(self, expr: Set) -> Any:
         obj = self._evaluate(expr.obj)
         if not isinstance(obj, LoxInstance):
             raise LoxRuntimeError(expr.name, 'Only instances have fields.')
         value = self._evaluate(expr.value)
-        obj.set(expr.name, value)
+        klass = obj.klass
+        if klass is not expr.cached_class:
+            expr.cached_class = klass
+            expr.cached_slot = klass.slot(expr.name.lexeme)
+        obj.set_slot(expr.cached_slot, value)
         return value
 
     def visit_this_expr(self, expr: This) -> Any:
         return self._lookup_variable(expr.keyword, expr)
 
     def visit_super_expr(self, expr: Super) -> Any:
-        distance = self.locals[expr]
+        distance = expr.distance
+        assert distance is not None
         superclass = self.environment.get_at(distance, 'super')
         obj = self.environment.get_at(distance - 1, 'this')
         method = superclass.find_method(expr.method.lexeme)
@@ -413,21 +574,5 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
                 expr.method, f'Undefined property "{expr.method.lexeme}".')
         return method.bind(obj)
 
-    def _check_number_operands(
-            self,
-            operator: Token,
-            left: Any,
-            right: Any) -> None:
-        if isinstance(left, float) and isinstance(right, float):
-            return
-        raise LoxRuntimeError(operator, 'Operands must be numbers.')
-
     def _evaluate(self, expr: Expr) -> Any:
-        return expr.accept(self)
-
-    def _is_truthy(self, obj: Any) -> Any:
-        if obj is None:
-            return False
-        if isinstance(obj, bool):
-            return bool(obj)
-        return True
+        return self._dispatch[expr.OP](expr)
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from functools import singledispatch
 from parser import Parser
 
-import common
+from common import state
 from interpreter import Interpreter
 from resolver import Resolver
 from scanner import Scanner
@@ -15,9 +15,9 @@ def _run_file(path: str) -> None:
     with open(path, 'r') as f:
         data = f.read()
     _run(data)
-    if common.had_error:
+    if state.had_error:
         sys.exit(65)
-    if common.had_runtime_error:
+    if state.had_runtime_error:
         sys.exit(70)
 
 
@@ -28,7 +28,7 @@ def _run_prompt() -> None:
         if not line:
             break
         _run(line)
-        common.had_error = False
+        state.had_error = False
 
 
 interpreter = Interpreter()
@@ -39,11 +39,11 @@ def _run(source: str) -> None:
     tokens = scanner.scan_tokens()
     parser = Parser(tokens)
     statements = parser.parse()
-    if common.had_error:
+    if state.had_error:
         return
     resolver = Resolver(interpreter)
     resolver.resolve(statements)
-    if common.had_error:
+    if state.had_error:
         return
     interpreter.interpret(statements)
 
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Callable, Optional
 
 from common import Token, TokenType, error
 from expr import (Assign, Binary, Call, Expr, Get, Grouping, Literal, Logical,
@@ -6,6 +6,57 @@ from expr import (Assign, Binary, Call, Expr, Get, Grouping, Literal, Logical,
 from stmt import (Block, Class, Expression, Function, If, Print, Return, Stmt,
                   Var, While)
 
+# Token types tested in rule bodies, bound once so a check loads a module
+# global instead of an enum attribute.
+_BANG = TokenType.BANG
+_CLASS = TokenType.CLASS
+_COMMA = TokenType.COMMA
+_DOT = TokenType.DOT
+_ELSE = TokenType.ELSE
+_EOF = TokenType.EOF
+_EQUAL = TokenType.EQUAL
+_FUN = TokenType.FUN
+_IDENTIFIER = TokenType.IDENTIFIER
+_LEFT_BRACE = TokenType.LEFT_BRACE
+_LEFT_PAREN = TokenType.LEFT_PAREN
+_LESS = TokenType.LESS
+_MINUS = TokenType.MINUS
+_RIGHT_BRACE = TokenType.RIGHT_BRACE
+_RIGHT_PAREN = TokenType.RIGHT_PAREN
+_SEMICOLON = TokenType.SEMICOLON
+_VAR = TokenType.VAR
+
+# Binding power and node constructor of every infix operator; all of them
+# are left-associative.
+_BINARY_OPERATORS: dict[
+        TokenType, tuple[int, Callable[[Expr, Token, Expr], Expr]]] = {
+    TokenType.OR: (1, Logical),
+    TokenType.AND: (2, Logical),
+    TokenType.BANG_EQUAL: (3, Binary),
+    TokenType.EQUAL_EQUAL: (3, Binary),
+    TokenType.GREATER: (4, Binary),
+    TokenType.GREATER_EQUAL: (4, Binary),
+    TokenType.LESS: (4, Binary),
+    TokenType.LESS_EQUAL: (4, Binary),
+    TokenType.MINUS: (5, Binary),
+    TokenType.PLUS: (5, Binary),
+    TokenType.SLASH: (6, Binary),
+    TokenType.STAR: (6, Binary),
+}
+
+# Tokens that begin a declaration or statement; error recovery resumes at
+# the first one of these.
+_SYNC_TYPES = frozenset((
+    TokenType.CLASS,
+    TokenType.FUN,
+    TokenType.VAR,
+    TokenType.FOR,
+    TokenType.IF,
+    TokenType.WHILE,
+    TokenType.PRINT,
+    TokenType.RETURN,
+))
+
 
 class ParseError(RuntimeError):
     pass
@@ -15,7 +66,37 @@ class Parser:
 
     def __init__(self, tokens: list[Token]):
         self.tokens = tokens
+        # Parallel to tokens; most decisions only need the type, and a
+        # list index is cheaper than an index plus an attribute load.
+        self.types = [token.token_type for token in tokens]
         self.current = 0
+        self._statement_rules = self._build_statement_rules()
+        self._primary_rules = self._build_primary_rules()
+
+    # Both tables are keyed by the leading token of the rule, which the
+    # caller consumes before invoking the handler.
+    def _build_statement_rules(self) -> dict[TokenType, Callable[[], Stmt]]:
+        return {
+            TokenType.PRINT: self._print_statement,
+            TokenType.RETURN: self._return_statement,
+            TokenType.LEFT_BRACE: self._block_statement,
+            TokenType.IF: self._if_statement,
+            TokenType.WHILE: self._while_statement,
+            TokenType.FOR: self._for_statement,
+        }
+
+    def _build_primary_rules(self) -> dict[TokenType, Callable[[Token], Expr]]:
+        return {
+            TokenType.IDENTIFIER: Variable,
+            TokenType.NUMBER: self._literal,
+            TokenType.STRING: self._literal,
+            TokenType.FALSE: self._false,
+            TokenType.TRUE: self._true,
+            TokenType.NIL: self._nil,
+            TokenType.THIS: This,
+            TokenType.SUPER: self._super,
+            TokenType.LEFT_PAREN: self._grouping,
+        }
 
     def parse(self) -> list[Optional[Stmt]]:
         statements: list[Optional[Stmt]] = []
@@ -25,11 +106,11 @@ class Parser:
 
     def _declaration(self) -> Optional[Stmt]:
         try:
-            if self._match(TokenType.FUN):
+            if self._match1(_FUN):
                 return self._function('function')
-            if self._match(TokenType.VAR):
+            if self._match1(_VAR):
                 return self._var_declaration()
-            if self._match(TokenType.CLASS):
+            if self._match1(_CLASS):
                 return self._class_declaration()
             return self._statement()
         except ParseError as e:
@@ -37,118 +118,113 @@ class Parser:
             return None
 
     def _class_declaration(self) -> Stmt:
-        name = self._consume(TokenType.IDENTIFIER, 'Expect class name.')
+        name = self._consume(_IDENTIFIER, 'Expect class name.')
         superclass = None
-        if self._match(TokenType.LESS):
-            self._consume(TokenType.IDENTIFIER, 'Expect superclass name.')
-            superclass = Variable(self._previous())
-        self._consume(TokenType.LEFT_BRACE, 'Expect "{" before class body.')
+        if self._match1(_LESS):
+            superclass = Variable(self._consume(
+                _IDENTIFIER, 'Expect superclass name.'))
+        self._consume(_LEFT_BRACE, 'Expect "{" before class body.')
         methods: list[Function] = []
-        while not self._check(TokenType.RIGHT_BRACE) and not self._is_at_end():
+        while not self._check(_RIGHT_BRACE) and not self._is_at_end():
             methods.append(self._function('method'))
-        self._consume(TokenType.RIGHT_BRACE, 'Expect "}" after class body.')
+        self._consume(_RIGHT_BRACE, 'Expect "}" after class body.')
         return Class(name, superclass, methods)
 
     def _function(self, kind: str) -> Function:
-        name = self._consume(TokenType.IDENTIFIER, f'Expect {kind} name.')
-        self._consume(TokenType.LEFT_PAREN, f'Expect "(" after {kind} name."')
+        name = self._consume(_IDENTIFIER, f'Expect {kind} name.')
+        self._consume(_LEFT_PAREN, f'Expect "(" after {kind} name."')
         parameters: list[Token] = []
-        if not self._check(TokenType.RIGHT_PAREN):
+        if not self._check(_RIGHT_PAREN):
             while True:
                 if len(parameters) >= 255:
                     self._error(
                         self._peek(), 'Can\'t have more than 255 parameters.')
                 parameters.append(self._consume(
-                    TokenType.IDENTIFIER, 'Expect parameter name.'))
-                if not self._match(TokenType.COMMA):
+                    _IDENTIFIER, 'Expect parameter name.'))
+                if not self._match1(_COMMA):
                     break
-        self._consume(TokenType.RIGHT_PAREN,
+        self._consume(_RIGHT_PAREN,
                       'Expect ")" after parameters.')
-        self._consume(TokenType.LEFT_BRACE, f'Expect "{{" before {kind} body.')
+        self._consume(_LEFT_BRACE, f'Expect "{{" before {kind} body.')
         body = self._block()
         return Function(name, parameters, body)
 
     def _var_declaration(self) -> Var:
-        name = self._consume(TokenType.IDENTIFIER, 'Expect variable name.')
+        name = self._consume(_IDENTIFIER, 'Expect variable name.')
         initializer = None
-        if self._match(TokenType.EQUAL):
+        if self._match1(_EQUAL):
             initializer = self._expression()
-        self._consume(TokenType.SEMICOLON,
+        self._consume(_SEMICOLON,
                       'Expect ";" after variable declaration.')
         return Var(name, initializer)
 
     def _statement(self) -> Stmt:
-        if self._match(TokenType.PRINT):
-            return self._print_statement()
-        if self._match(TokenType.RETURN):
-            return self._return_statement()
-        if self._match(TokenType.LEFT_BRACE):
-            return Block(self._block())
-        if self._match(TokenType.IF):
-            return self._if_statement()
-        if self._match(TokenType.WHILE):
-            return self._while_statement()
-        if self._match(TokenType.FOR):
-            return self._for_statement()
-        return self._expression_statement()
+        rule = self._statement_rules.get(self.types[self.current])
+        if rule is None:
+            return self._expression_statement()
+        self.current += 1
+        return rule()
 
     def _print_statement(self) -> Print:
         value = self._expression()
-        self._consume(TokenType.SEMICOLON, 'Expect ";" after value.')
+        self._consume(_SEMICOLON, 'Expect ";" after value.')
         return Print(value)
 
     def _return_statement(self) -> Return:
         keyword = self._previous()
-        if not self._check(TokenType.SEMICOLON):
+        if not self._check(_SEMICOLON):
             value = self._expression()
         else:
             value = None
-        self._consume(TokenType.SEMICOLON, 'Expect ";" after return value.')
+        self._consume(_SEMICOLON, 'Expect ";" after return value.')
         return Return(keyword, value)
 
+    def _block_statement(self) -> Block:
+        return Block(self._block())
+
     def _expression_statement(self) -> Expression:
         expr = self._expression()
-        self._consume(TokenType.SEMICOLON, 'Expect ";" after expression.')
+        self._consume(_SEMICOLON, 'Expect ";" after expression.')
         return Expression(expr)
 
     def _if_statement(self) -> If:
-        self._consume(TokenType.LEFT_PAREN, 'Expect "(" after if.')
+        self._consume(_LEFT_PAREN, 'Expect "(" after if.')
         condition = self._expression()
-        self._consume(TokenType.RIGHT_PAREN, 'Expect ")" after if condition.')
+        self._consume(_RIGHT_PAREN, 'Expect ")" after if condition.')
         then_branch = self._statement()
-        if self._match(TokenType.ELSE):
+        if self._match1(_ELSE):
             else_branch = self._statement()
         else:
             else_branch = None
         return If(condition, then_branch, else_branch)
 
     def _while_statement(self) -> While:
-        self._consume(TokenType.LEFT_PAREN, 'Expect "(" after while.')
+        self._consume(_LEFT_PAREN, 'Expect "(" after while.')
         condition = self._expression()
-        self._consume(TokenType.RIGHT_PAREN,
+        self._consume(_RIGHT_PAREN,
                       'Expect ")" after while condition.')
         body = self._statement()
         return While(condition, body)
 
     def _for_statement(self) -> Stmt:
-        self._consume(TokenType.LEFT_PAREN, 'Expect "(" after for.')
+        self._consume(_LEFT_PAREN, 'Expect "(" after for.')
         initializer: Optional[Stmt]
-        if self._match(TokenType.SEMICOLON):
+        if self._match1(_SEMICOLON):
             initializer = None
-        elif self._match(TokenType.VAR):
+        elif self._match1(_VAR):
             initializer = self._var_declaration()
         else:
             initializer = self._expression_statement()
-        if not self._check(TokenType.SEMICOLON):
+        if not self._check(_SEMICOLON):
             condition = self._expression()
         else:
             condition = None
-        self._consume(TokenType.SEMICOLON, 'Expect ";" after loop condition.')
-        if not self._check(TokenType.RIGHT_PAREN):
+        self._consume(_SEMICOLON, 'Expect ";" after loop condition.')
+        if not self._check(_RIGHT_PAREN):
             increment = self._expression()
         else:
             increment = None
-        self._consume(TokenType.RIGHT_PAREN, 'Expect ")" after for clauses.')
+        self._consume(_RIGHT_PAREN, 'Expect ")" after for clauses.')
         body = self._statement()
 
         if increment is not None:
@@ -162,18 +238,19 @@ class Parser:
 
     def _block(self) -> list[Optional[Stmt]]:
         statements: list[Optional[Stmt]] = []
-        while not self._check(TokenType.RIGHT_BRACE) and not self._is_at_end():
+        while not self._check(_RIGHT_BRACE) and not self._is_at_end():
             statements.append(self._declaration())
-        self._consume(TokenType.RIGHT_BRACE, 'Expect "}" after block.')
+        self._consume(_RIGHT_BRACE, 'Expect "}" after block.')
         return statements
 
     def _expression(self) -> Expr:
         return self._assignment()
 
     def _assignment(self) -> Expr:
-        expr = self._or()
-        if self._match(TokenType.EQUAL):
-            equals = self._previous()
+        expr = self._binary(1)
+        if self.types[self.current] is _EQUAL:
+            equals = self.tokens[self.current]
+            self.current += 1
             value = self._assignment()
             if isinstance(expr, Variable):
                 return Assign(expr.name, value)
@@ -182,129 +259,101 @@ class Parser:
             self._error(equals, 'Invalid assignment target.')
         return expr
 
-    def _or(self) -> Expr:
-        expr = self._and()
-        while self._match(TokenType.OR):
-            operator = self._previous()
-            right = self._and()
-            expr = Logical(expr, operator, right)
-        return expr
-
-    def _and(self) -> Expr:
-        expr = self._equality()
-        while self._match(TokenType.AND):
-            operator = self._previous()
-            right = self._equality()
-            expr = Logical(expr, operator, right)
-        return expr
-
-    def _equality(self) -> Expr:
-        expr = self._comparison()
-        while self._match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator: Token = self._previous()
-            right: Expr = self._comparison()
-            expr = Binary(expr, operator, right)
-        return expr
-
-    def _comparison(self) -> Expr:
-        expr = self._term()
-        while self._match(
-                TokenType.GREATER,
-                TokenType.GREATER_EQUAL,
-                TokenType.LESS,
-                TokenType.LESS_EQUAL):
-            operator: Token = self._previous()
-            right: Expr = self._term()
-            expr = Binary(expr, operator, right)
-        return expr
-
-    def _term(self) -> Expr:
-        expr = self._factor()
-        while self._match(TokenType.MINUS, TokenType.PLUS):
-            operator = self._previous()
-            right = self._factor()
-            expr = Binary(expr, operator, right)
-        return expr
-
-    def _factor(self) -> Expr:
+    def _binary(self, min_precedence: int) -> Expr:
+        types = self.types
         expr = self._unary()
-        while self._match(TokenType.SLASH, TokenType.STAR):
-            operator = self._previous()
-            right = self._unary()
-            expr = Binary(expr, operator, right)
-        return expr
+        while True:
+            entry = _BINARY_OPERATORS.get(types[self.current])
+            if entry is None or entry[0] < min_precedence:
+                return expr
+            precedence, node = entry
+            operator = self.tokens[self.current]
+            self.current += 1
+            right = self._binary(precedence + 1)
+            expr = node(expr, operator, right)
 
     def _unary(self) -> Expr:
-        if self._match(TokenType.BANG, TokenType.MINUS):
-            operator = self._previous()
+        token_type = self.types[self.current]
+        if token_type is _BANG or token_type is _MINUS:
+            operator = self.tokens[self.current]
+            self.current += 1
             right = self._unary()
             return Unary(operator, right)
         return self._call()
 
     def _call(self) -> Expr:
+        types = self.types
         expr = self._primary()
         while True:
-            if self._match(TokenType.LEFT_PAREN):
+            token_type = types[self.current]
+            if token_type is _LEFT_PAREN:
+                self.current += 1
                 expr = self._finish_call(expr)
-            elif self._match(TokenType.DOT):
-                name = self._consume(TokenType.IDENTIFIER,
+            elif token_type is _DOT:
+                self.current += 1
+                name = self._consume(_IDENTIFIER,
                                      'Expect property name after ".".')
                 expr = Get(expr, name)
             else:
-                break
-        return expr
+                return expr
 
     def _finish_call(self, callee: Expr) -> Expr:
+        types = self.types
         arguments: list[Expr] = []
-        if not self._check(TokenType.RIGHT_PAREN):
+        if types[self.current] is not _RIGHT_PAREN:
             while True:
                 if len(arguments) >= 255:
-                    self._error(
-                        self._peek(), 'Can\'t have more than 255 arguments.')
+                    self._error(self.tokens[self.current],
+                                'Can\'t have more than 255 arguments.')
                 arguments.append(self._expression())
-                if not self._match(TokenType.COMMA):
+                if types[self.current] is not _COMMA:
                     break
-        paren = self._consume(TokenType.RIGHT_PAREN,
+                self.current += 1
+        paren = self._consume(_RIGHT_PAREN,
                               'Expect ")" after arguments.')
         return Call(callee, paren, arguments)
 
     def _primary(self) -> Expr:
-        if self._match(TokenType.FALSE):
-            return Literal(False)
-        if self._match(TokenType.TRUE):
-            return Literal(True)
-        if self._match(TokenType.NIL):
-            return Literal(None)
-        if self._match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self._previous().literal)
-        if self._match(TokenType.SUPER):
-            keyword = self._previous()
-            self._consume(TokenType.DOT, 'Expect "." after "super".')
-            method = self._consume(TokenType.IDENTIFIER,
-                                   "Expect superclass method name.")
-            return Super(keyword, method)
-        if self._match(TokenType.THIS):
-            return This(self._previous())
-        if self._match(TokenType.IDENTIFIER):
-            return Variable(self._previous())
-        if self._match(TokenType.LEFT_PAREN):
-            expr = self._expression()
-            self._consume(TokenType.RIGHT_PAREN,
-                          'Expect ")" after expression.')
-            return Grouping(expr)
-        raise self._error(self._peek(), 'Expect expression.')
-
-    def _match(self, *token_types: TokenType) -> bool:
-        for token_type in token_types:
-            if self._check(token_type):
-                self._advance()
-                return True
+        i = self.current
+        rule = self._primary_rules.get(self.types[i])
+        if rule is None:
+            raise self._error(self.tokens[i], 'Expect expression.')
+        self.current = i + 1
+        return rule(self.tokens[i])
+
+    def _literal(self, token: Token) -> Literal:
+        return Literal(token.literal)
+
+    def _false(self, token: Token) -> Literal:
+        return Literal(False)
+
+    def _true(self, token: Token) -> Literal:
+        return Literal(True)
+
+    def _nil(self, token: Token) -> Literal:
+        return Literal(None)
+
+    def _super(self, keyword: Token) -> Super:
+        self._consume(_DOT, 'Expect "." after "super".')
+        method = self._consume(_IDENTIFIER,
+                               "Expect superclass method name.")
+        return Super(keyword, method)
+
+    def _grouping(self, token: Token) -> Grouping:
+        expr = self._expression()
+        self._consume(_RIGHT_PAREN, 'Expect ")" after expression.')
+        return Grouping(expr)
+
+    # EOF is never passed to _match1, _check or _consume, so the EOF token
+    # can never match and needs no separate end-of-input test.
+    def _match1(self, token_type: TokenType) -> bool:
+        if self.types[self.current] is token_type:
+            self.current += 1
+            return True
         return False
 
     def _check(self, token_type: TokenType) -> bool:
-        if self._is_at_end():
-            return False
-        return self._peek().token_type == token_type
+        return self.types[self.current] is token_type
 
     def _advance(self) -> Token:
         if not self._is_at_end():
@@ -312,7 +361,7 @@ class Parser:
         return self._previous()
 
     def _is_at_end(self) -> bool:
-        return self._peek().token_type == TokenType.EOF
+        return self.types[self.current] is _EOF
 
     def _peek(self) -> Token:
         return self.tokens[self.current]
@@ -321,9 +370,11 @@ class Parser:
         return self.tokens[self.current - 1]
 
     def _consume(self, token_type: TokenType, msg: str) -> Token:
-        if self._check(token_type):
-            return self._advance()
-        raise self._error(self._peek(), msg)
+        i = self.current
+        if self.types[i] is token_type:
+            self.current = i + 1
+            return self.tokens[i]
+        raise self._error(self.tokens[i], msg)
 
     def _error(self, token: Token, msg: str) -> ParseError:
         error(token, msg)
@@ -332,16 +383,8 @@ class Parser:
     def _synchronize(self) -> None:
         self._advance()
         while not self._is_at_end():
-            if self._previous().token_type == TokenType.SEMICOLON:
+            if self.types[self.current - 1] is _SEMICOLON:
                 return
-            if self._peek().token_type in (
-                    TokenType.CLASS,
-                    TokenType.FUN,
-                    TokenType.VAR,
-                    TokenType.FOR,
-                    TokenType.IF,
-                    TokenType.WHILE,
-                    TokenType.PRINT,
-                    TokenType.RETURN):
+            if self.types[self.current] in _SYNC_TYPES:
                 return
             self._advance()
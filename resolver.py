@@ -1,5 +1,5 @@
 import enum
-from functools import singledispatchmethod
+from typing import Any, Callable, Optional, Union
 
 from common import Token, error
 from expr import (Assign, Binary, Call, Expr, ExprVisitor, Get, Grouping,
@@ -27,8 +27,35 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
     def __init__(self, interpreter: Interpreter):
         self.interpreter = interpreter
         self.scopes: list[dict[str, bool]] = []
+        # For every name declared in an open scope, the indices into scopes
+        # of the scopes declaring it, innermost last.
+        self._depths: dict[str, list[int]] = {}
         self.current_function = FunctionType.NONE
         self.current_class = ClassType.NONE
+        # Keyed by node class; replaces the accept() round trip.
+        self._dispatch: dict[type, Callable[[Any], None]] = {
+            Block: self.visit_block_stmt,
+            Class: self.visit_class_stmt,
+            Expression: self.visit_expression_stmt,
+            Function: self.visit_function_stmt,
+            If: self.visit_if_stmt,
+            Print: self.visit_print_stmt,
+            Return: self.visit_return_stmt,
+            Var: self.visit_var_stmt,
+            While: self.visit_while_stmt,
+            Assign: self.visit_assign_expr,
+            Binary: self.visit_binary_expr,
+            Call: self.visit_call_expr,
+            Get: self.visit_get_expr,
+            Grouping: self.visit_grouping_expr,
+            Literal: self.visit_literal_expr,
+            Logical: self.visit_logical_expr,
+            Set: self.visit_set_expr,
+            Super: self.visit_super_expr,
+            This: self.visit_this_expr,
+            Unary: self.visit_unary_expr,
+            Variable: self.visit_variable_expr,
+        }
 
     def visit_block_stmt(self, stmt: Block) -> None:
         self._begin_scope()
@@ -36,24 +63,28 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
         self._end_scope()
         return None
 
-    @singledispatchmethod
-    def resolve(self, statements: list[Stmt]) -> None:
-        for statement in statements:
-            self.resolve(statement)
-
-    @resolve.register
-    def _(self, statement: Stmt) -> None:
-        statement.accept(self)
-
-    @resolve.register
-    def _(self, expr: Expr) -> None:
-        expr.accept(self)
+    def resolve(self,
+                target: Union[list[Optional[Stmt]], Stmt, Expr]) -> None:
+        dispatch = self._dispatch
+        if isinstance(target, list):
+            for statement in target:
+                dispatch[type(statement)](statement)
+        else:
+            dispatch[type(target)](target)
 
     def _begin_scope(self) -> None:
         self.scopes.append(dict())
 
     def _end_scope(self) -> None:
-        self.scopes.pop()
+        depths = self._depths
+        for name in self.scopes.pop():
+            depths[name].pop()
+
+    def _put(self, name: str, defined: bool) -> None:
+        scope = self.scopes[-1]
+        if name not in scope:
+            self._depths.setdefault(name, []).append(len(self.scopes) - 1)
+        scope[name] = defined
 
     def visit_var_stmt(self, stmt: Var) -> None:
         self._declare(stmt.name)
@@ -66,23 +97,26 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
             return
         if name.lexeme in self.scopes[-1]:
             error(name, 'Already a variable with this name in this scope.')
-        self.scopes[-1][name.lexeme] = False
+        self._put(name.lexeme, False)
 
     def _define(self, name: Token) -> None:
         if not self.scopes:
             return
-        self.scopes[-1][name.lexeme] = True
+        self._put(name.lexeme, True)
 
     def visit_variable_expr(self, expr: Variable) -> None:
-        if self.scopes and self.scopes[-1].get(expr.name.lexeme) == False:
-            error(expr.name, 'Can\'t read local variable in its own initializer.')
+        if self.scopes and self.scopes[-1].get(expr.name.lexeme) is False:
+            error(expr.name,
+                  'Can\'t read local variable in its own initializer.')
         self._resolve_local(expr, expr.name)
 
-    def _resolve_local(self, expr: Expr, name: Token) -> None:
-        for i, s in reversed(list(enumerate(self.scopes))):
-            if name.lexeme in s:
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
-                return
+    def _resolve_local(
+            self,
+            expr: Union[Variable, Assign, This, Super],
+            name: Token) -> None:
+        depths = self._depths.get(name.lexeme)
+        if depths:
+            self.interpreter.resolve(expr, len(self.scopes) - 1 - depths[-1])
 
     def visit_assign_expr(self, expr: Assign) -> None:
         self.resolve(expr.value)
@@ -134,13 +168,23 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
         self.resolve(stmt.body)
 
     def visit_binary_expr(self, expr: Binary) -> None:
-        self.resolve(expr.left)
-        self.resolve(expr.right)
+        # Mirrors Interpreter.visit_binary_expr: resolve long left-leaning
+        # operator chains without recursing once per operator.
+        spine = [expr]
+        left = expr.left
+        while type(left) is Binary:
+            spine.append(left)
+            left = left.left
+        resolve = self.resolve
+        resolve(left)
+        for node in reversed(spine):
+            resolve(node.right)
 
     def visit_call_expr(self, expr: Call) -> None:
-        self.resolve(expr.callee)
+        resolve = self.resolve
+        resolve(expr.callee)
         for argument in expr.arguments:
-            self.resolve(argument)
+            resolve(argument)
 
     def visit_grouping_expr(self, expr: Grouping) -> None:
         self.resolve(expr.expression)
@@ -149,8 +193,15 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
         return None
 
     def visit_logical_expr(self, expr: Logical) -> None:
-        self.resolve(expr.left)
-        self.resolve(expr.right)
+        spine = [expr]
+        left = expr.left
+        while type(left) is Logical:
+            spine.append(left)
+            left = left.left
+        resolve = self.resolve
+        resolve(left)
+        for node in reversed(spine):
+            resolve(node.right)
 
     def visit_unary_expr(self, expr: Unary) -> None:
         self.resolve(expr.right)
@@ -167,9 +218,9 @@ class Resolver(StmtVisitor[None], ExprVisitor[None]):
             self.resolve(stmt.superclass)
         if stmt.superclass is not None:
             self._begin_scope()
-            self.scopes[-1]['super'] = True
+            self._put('super', True)
         self._begin_scope()
-        self.scopes[-1]['this'] = True
+        self._put('this', True)
         for method in stmt.methods:
             declaration = FunctionType.METHOD
             if method.name.lexeme == 'init':
@@ -1,7 +1,38 @@
-from typing import Union
+import sys
+from functools import partial
+from typing import Callable, Union
 
 from common import KEYWORDS, Token, TokenType, error
 
+_DIGITS = frozenset('0123456789')
+_ALPHA = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+_ALPHA_NUMERIC = _ALPHA | _DIGITS
+
+# Lexemes of every token whose text is determined by its type, so adding one
+# does not need to slice the source.
+_FIXED_LEXEME: dict[TokenType, str] = {
+    TokenType.LEFT_PAREN: '(',
+    TokenType.RIGHT_PAREN: ')',
+    TokenType.LEFT_BRACE: '{',
+    TokenType.RIGHT_BRACE: '}',
+    TokenType.COMMA: ',',
+    TokenType.DOT: '.',
+    TokenType.MINUS: '-',
+    TokenType.PLUS: '+',
+    TokenType.SEMICOLON: ';',
+    TokenType.SLASH: '/',
+    TokenType.STAR: '*',
+    TokenType.BANG: '!',
+    TokenType.BANG_EQUAL: '!=',
+    TokenType.EQUAL: '=',
+    TokenType.EQUAL_EQUAL: '==',
+    TokenType.GREATER: '>',
+    TokenType.GREATER_EQUAL: '>=',
+    TokenType.LESS: '<',
+    TokenType.LESS_EQUAL: '<=',
+    **{token_type: lexeme for lexeme, token_type in KEYWORDS.items()},
+}
+
 
 class Scanner:
 
@@ -11,152 +42,156 @@ class Scanner:
         self.start = 0
         self.current = 0
         self.line = 1
+        self._dispatch = self._build_dispatch()
+
+    def _build_dispatch(self) -> list[Callable[[], None]]:
+        # Indexed by the ordinal of the first character of a token.
+        dispatch: list[Callable[[], None]] = [self._unexpected] * 256
+        for c in _DIGITS:
+            dispatch[ord(c)] = self._number
+        for c in _ALPHA:
+            dispatch[ord(c)] = self._identifier
+        for c, token_type in (
+                ('(', TokenType.LEFT_PAREN),
+                (')', TokenType.RIGHT_PAREN),
+                ('{', TokenType.LEFT_BRACE),
+                ('}', TokenType.RIGHT_BRACE),
+                (',', TokenType.COMMA),
+                ('.', TokenType.DOT),
+                ('-', TokenType.MINUS),
+                ('+', TokenType.PLUS),
+                (';', TokenType.SEMICOLON),
+                ('*', TokenType.STAR)):
+            dispatch[ord(c)] = partial(self._add_token, token_type)
+        for c, token_type, with_equal in (
+                ('!', TokenType.BANG, TokenType.BANG_EQUAL),
+                ('=', TokenType.EQUAL, TokenType.EQUAL_EQUAL),
+                ('<', TokenType.LESS, TokenType.LESS_EQUAL),
+                ('>', TokenType.GREATER, TokenType.GREATER_EQUAL)):
+            dispatch[ord(c)] = partial(self._operator, token_type, with_equal)
+        dispatch[ord('/')] = self._slash
+        for c in (' ', '\r', '\t'):
+            dispatch[ord(c)] = self._whitespace
+        dispatch[ord('\n')] = self._newline
+        dispatch[ord('"')] = self._string
+        return dispatch
 
     def scan_tokens(self) -> list[Token]:
-        while not self._is_at_end():
+        source = self.source
+        end = len(source)
+        dispatch = self._dispatch
+        while self.current < end:
             self.start = self.current
-            self._scan_token()
+            o = ord(source[self.current])
+            self.current += 1
+            if o < 256:
+                dispatch[o]()
+            else:
+                self._unexpected()
         self.tokens.append(Token(TokenType.EOF, '', None, self.line))
         return self.tokens
 
-    def _is_at_end(self) -> bool:
-        return self.current >= len(self.source)
-
-    def _scan_token(self) -> None:
-        c = self._advance()
-        if c == '(':
-            self._add_token(TokenType.LEFT_PAREN)
-        elif c == ')':
-            self._add_token(TokenType.RIGHT_PAREN)
-        elif c == '{':
-            self._add_token(TokenType.LEFT_BRACE)
-        elif c == '}':
-            self._add_token(TokenType.RIGHT_BRACE)
-        elif c == ',':
-            self._add_token(TokenType.COMMA)
-        elif c == '.':
-            self._add_token(TokenType.DOT)
-        elif c == '-':
-            self._add_token(TokenType.MINUS)
-        elif c == '+':
-            self._add_token(TokenType.PLUS)
-        elif c == ';':
-            self._add_token(TokenType.SEMICOLON)
+    def _operator(self, token_type: TokenType,
+                  with_equal: TokenType) -> None:
+        source = self.source
+        i = self.current
+        if i < len(source) and source[i] == '=':
+            self.current = i + 1
+            token_type = with_equal
+        self.tokens.append(Token(
+            token_type, _FIXED_LEXEME[token_type], None, self.line))
+
+    def _slash(self) -> None:
+        source = self.source
+        i = self.current
+        c = source[i] if i < len(source) else ''
+        if c == '/':
+            newline = source.find('\n', i + 1)
+            self.current = len(source) if newline < 0 else newline
         elif c == '*':
-            self._add_token(TokenType.STAR)
-        elif c == '!':
-            self._add_token(TokenType.BANG_EQUAL if self._match(
-                '=') else TokenType.BANG)
-        elif c == '=':
-            self._add_token(TokenType.EQUAL_EQUAL if self._match(
-                '=') else TokenType.EQUAL)
-        elif c == '<':
-            self._add_token(TokenType.LESS_EQUAL if self._match(
-                '=') else TokenType.LESS)
-        elif c == '>':
-            self._add_token(TokenType.GREATER_EQUAL if self._match(
-                '=') else TokenType.GREATER)
-        elif c == '/':
-            if self._match('/'):
-                while self._peek() != '\n' and not self._is_at_end():
-                    self._advance()
-            elif self._match('*'):
-                self._c_style_comment()
-            else:
-                self._add_token(TokenType.SLASH)
-        elif c in (' ', '\r', '\t'):
-            pass
-        elif c == '\n':
-            self.line += 1
-        elif c == '"':
-            self._string()
+            self.current = i + 1
+            self._c_style_comment()
         else:
-            if c.isdigit():
-                self._number()
-            elif c.isalpha():
-                self._identifier()
-            else:
-                error(self.line, 'Unexpected character')
+            self._add_token(TokenType.SLASH)
+
+    def _whitespace(self) -> None:
+        pass
+
+    def _newline(self) -> None:
+        self.line += 1
 
-    def _advance(self) -> str:
-        c = self.source[self.current]
-        self.current += 1
-        return c
+    def _unexpected(self) -> None:
+        error(self.line, 'Unexpected character')
 
     def _add_token(self, token_type: TokenType) -> None:
-        self._do_add_token(token_type, None)
+        self.tokens.append(Token(
+            token_type, _FIXED_LEXEME[token_type], None, self.line))
 
     def _do_add_token(self, token_type: TokenType,
                       literal: Union[None, str, float]) -> None:
         text = self.source[self.start:self.current]
         self.tokens.append(Token(token_type, text, literal, self.line))
 
-    def _match(self, c: str) -> bool:
-        if self._is_at_end():
-            return False
-        if self.source[self.current] != c:
-            return False
-        self.current += 1
-        return True
-
-    def _peek(self) -> str:
-        if self._is_at_end():
-            return ''
-        return self.source[self.current]
-
     def _string(self) -> None:
-        while self._peek() != '"' and not self._is_at_end():
-            if self._peek() == '\n':
-                self.line += 1
-            self._advance()
-        if self._is_at_end():
+        source = self.source
+        start = self.current
+        end = source.find('"', start)
+        if end < 0:
+            self.line += source.count('\n', start)
+            self.current = len(source)
             error(self.line, 'Unterminated string.')
             return
+        self.line += source.count('\n', start, end)
 
-        # The closing ".
-        self._advance()
+        # Skip the closing ".
+        self.current = end + 1
 
         # Trim the surrounding quotes.
-        val = self.source[self.start + 1:self.current - 1]
-        self._do_add_token(TokenType.STRING, val)
+        self._do_add_token(TokenType.STRING, source[start:end])
 
     def _number(self) -> None:
-        while self._peek().isdigit():
-            self._advance()
+        source = self.source
+        end = len(source)
+        i = self.current
+        while i < end and source[i] in _DIGITS:
+            i += 1
 
         # Look for a fractional part.
-        if self._peek() == '.' and self._peek_next().isdigit():
+        if i + 1 < end and source[i] == '.' and source[i + 1] in _DIGITS:
             # Consume the "."
-            self._advance()
-            while self._peek().isdigit():
-                self._advance()
-
-        self._do_add_token(TokenType.NUMBER, float(
-            self.source[self.start:self.current]))
+            i += 1
+            while i < end and source[i] in _DIGITS:
+                i += 1
 
-    def _peek_next(self) -> str:
-        if self.current + 1 >= len(self.source):
-            return ''
-        return self.source[self.current + 1]
+        self.current = i
+        self._do_add_token(TokenType.NUMBER, float(source[self.start:i]))
 
     def _identifier(self) -> None:
-        while self._peek().isalnum():
-            self._advance()
-        text = self.source[self.start:self.current]
+        source = self.source
+        end = len(source)
+        i = self.current
+        while i < end and source[i] in _ALPHA_NUMERIC:
+            i += 1
+        self.current = i
+        text = source[self.start:i]
         token_type = KEYWORDS.get(text)
         if token_type is None:
-            token_type = TokenType.IDENTIFIER
+            # Identifier lexemes key every environment, field and method
+            # dict, so intern them once here.
+            self.tokens.append(Token(
+                TokenType.IDENTIFIER, sys.intern(text), None, self.line))
+            return
         self._add_token(token_type)
 
     def _c_style_comment(self) -> None:
-        while not self._is_at_end() and not (
-                self._peek() == '*' and self._peek_next() == '/'):
-            if self._peek() == '\n':
-                self.line += 1
-            self._advance()
-        if self._is_at_end():
+        source = self.source
+        start = self.current
+        end = source.find('*/', start)
+        if end < 0:
+            self.line += source.count('\n', start)
+            self.current = len(source)
             error(self.line, 'Unterminated comment')
             return
-        # The closing "*/"
-        self._advance()
-        self._advance()
+        self.line += source.count('\n', start, end)
+        # Skip the closing "*/"
+        self.current = end + 2
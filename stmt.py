@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import abc
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from typing import Generic, Optional, TypeVar
 
 from common import Token
@@ -9,15 +10,20 @@ from expr import Expr, Variable
 
 _T = TypeVar('_T')
 
+# dataclass() only accepts slots= from Python 3.10 on; older versions get
+# nodes with a per-instance __dict__.
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
 class Stmt(abc.ABC):
+    __slots__ = ()
 
     @abc.abstractmethod
     def accept(self, visitor: StmtVisitor[_T]) -> _T:
         pass
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Expression(Stmt):
     expression: Expr
 
@@ -25,7 +31,7 @@ class Expression(Stmt):
         return visitor.visit_expression_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Print(Stmt):
     expression: Expr
 
@@ -33,7 +39,7 @@ class Print(Stmt):
         return visitor.visit_print_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Return(Stmt):
     keyword: Token
     value: Optional[Expr]
@@ -42,7 +48,7 @@ class Return(Stmt):
         return visitor.visit_return_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Var(Stmt):
     name: Token
     initializer: Optional[Expr]
@@ -51,7 +57,7 @@ class Var(Stmt):
         return visitor.visit_var_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Block(Stmt):
     statements: list[Optional[Stmt]]
 
@@ -59,7 +65,7 @@ class Block(Stmt):
         return visitor.visit_block_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class If(Stmt):
     condition: Expr
     then_branch: Stmt
@@ -69,7 +75,7 @@ class If(Stmt):
         return visitor.visit_if_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class While(Stmt):
     condition: Expr
     body: Stmt
@@ -78,17 +84,26 @@ class While(Stmt):
         return visitor.visit_while_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Function(Stmt):
     name: Token
     params: list[Token]
     body: list[Optional[Stmt]]
+    param_names: tuple[str, ...] = field(init=False)
+    # False when a call never defines anything in its own scope: no
+    # parameters and no declarations directly in the body.
+    needs_frame: bool = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.param_names = tuple(p.lexeme for p in self.params)
+        self.needs_frame = bool(self.params) or any(
+            isinstance(s, (Var, Function, Class)) for s in self.body)
 
     def accept(self, visitor: StmtVisitor[_T]) -> _T:
         return visitor.visit_function_stmt(self)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, **_SLOTS)
 class Class(Stmt):
     name: Token
     superclass: Optional[Variable]